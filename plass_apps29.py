@@ -4,20 +4,49 @@ import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 import dash
-from dash import dcc, html, Input, Output, State, dash_table
+from dash import dcc, html, Input, Output, State, dash_table, ctx, no_update
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
 import networkx as nx
+import numpy as np
+from scipy.optimize import minimize
+from numba import njit, prange
 import io
 import base64
 import tempfile
 import os
 import plotly.io as pio
+from plotly.colors import get_colorscale, sample_colorscale
 import json
+import hashlib
+import functools
+from flask_caching import Cache
+import diskcache
 
-app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+# Slow jobs (image export) run in background worker processes instead of blocking the Dash worker
+background_callback_manager = dash.DiskcacheManager(diskcache.Cache(os.path.join(tempfile.gettempdir(), 'plasmidflow-jobs')))
+
+app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP],
+                background_callback_manager=background_callback_manager)
 server = app.server
 app.title = "PlasmidFlow"
 
+# Parsed uploads live server-side; the browser only holds a cache key
+CACHE_DIR = os.path.join(tempfile.gettempdir(), 'plasmidflow')
+cache = Cache(app.server, config={'CACHE_TYPE': 'FileSystemCache', 'CACHE_DIR': CACHE_DIR})
+
+# Exported images, named by a hash of everything that determines their content
+RENDER_DIR = os.path.join(tempfile.gettempdir(), 'plasmidflow-renders')
+RENDER_CACHE_MAX = 200
+os.makedirs(RENDER_DIR, exist_ok=True)
+
+# Past these sizes SVG rendering bogs down the browser, so switch to WebGL / raster output
+WEBGL_MIN_POINTS = 1000
+HEATMAP_IMAGE_MIN_CELLS = 10000
+HEATMAP_TEXT_MAX_CELLS = 500
+
+PREVIEW_PAGE_SIZE = 5
+
 app.layout = dbc.Container([
     html.Div([
         html.Div([
@@ -62,7 +91,15 @@ app.layout = dbc.Container([
             },
             multiple=False
         ),
-        html.Div(id='output-preview')
+        html.Div(id='output-preview'),
+        # Pages are served from the server-side cache; only the visible rows are sent to the browser
+        html.Div(id='preview-pane', children=dash_table.DataTable(
+            id='preview-table',
+            page_action='custom',
+            page_current=0,
+            page_size=PREVIEW_PAGE_SIZE,
+            style_table={"overflowX": "auto"}
+        ), style={"display": "none"})
     ], style={"backgroundColor": "white", "padding": "20px", "borderRadius": "10px"}),
 
     dcc.Store(id='stored-data'),
@@ -79,6 +116,10 @@ app.layout = dbc.Container([
         html.Label("Filter by Environment:"),
         dcc.Input(id='env-filter', type='text', placeholder='Type or paste environment name', debounce=True, style={'width': '100%', 'margin-bottom': '10px'}),
 
+        html.Label("Max Flows / Nodes Shown (largest kept; downloads include everything):"),
+        dcc.Slider(id='top-k', min=100, max=5000, step=100, value=1000,
+                   marks={v: str(v) for v in [100, 1000, 2500, 5000]}),
+
         html.Label("Select Traits to Display:"),
         html.Div([
             html.Label("Gene Transfer Flow:"),
@@ -98,7 +139,15 @@ app.layout = dbc.Container([
         dcc.Tab(label='🔥 Trait Presence Matrix', value='heatmap')
     ]),
 
-    html.Div(id='tabs-content', style={"backgroundColor": "white", "padding": "20px", "borderRadius": "10px"}),
+    # One always-mounted graph per tab; switching tabs only toggles visibility so earlier renders are kept
+    html.Div(id='tabs-content', children=[
+        html.Div(id=f'{tab}-pane', children=[
+            html.Div("Please upload a dataset.", id=f'{tab}-message'),
+            dcc.Graph(id=f'{tab}-graph', figure=go.Figure()),
+            dcc.Store(id=f'{tab}-rendered')
+        ], style={} if tab == 'sankey' else {"display": "none"})
+        for tab in ['sankey', 'network', 'heatmap']
+    ], style={"backgroundColor": "white", "padding": "20px", "borderRadius": "10px"}),
 
     html.Div([
         html.H4("🎨 Graph Customization"),
@@ -156,24 +205,75 @@ app.layout = dbc.Container([
 def parse_contents(contents):
     content_type, content_string = contents.split(',')
     decoded = base64.b64decode(content_string)
-    return pd.read_csv(io.StringIO(decoded.decode('utf-8')))
+    # pyarrow parses the raw bytes with multiple threads straight into Arrow-backed columns
+    df = pd.read_csv(io.BytesIO(decoded), engine='pyarrow', dtype_backend='pyarrow')
+    # Low-cardinality text columns: categoricals shrink memory and turn filters into integer compares
+    for c in ['ARGs', 'Virulence', 'T4SS', 'MGEs', 'Environment', 'Host_Genome', 'Plasmid_ID']:
+        if c in df.columns:
+            # Via string first: an all-blank column arrives as null[pyarrow], which cannot become a categorical
+            df[c] = df[c].astype('string[pyarrow]').astype('category')
+    return df
+
+def trait_present(col):
+    # Compare each category against 'no' once, then look rows up by their integer code
+    col = col.astype('category')
+    present = np.append(col.cat.categories.astype(str).str.lower() != 'no', True)  # code -1 (missing) is kept
+    return present[col.cat.codes.to_numpy()]
+
+def env_matches(col, needle):
+    # Case-insensitive substring test per distinct environment, then a lookup by code; missing never matches
+    col = col.astype('category')
+    hits = np.append(col.cat.categories.astype(str).str.lower().str.contains(needle, regex=False), False)
+    return hits[col.cat.codes.to_numpy()]
 
 def filter_by_traits(df, traits):
+    # Never mutates df; with no traits selected the frame is returned as-is rather than copied
+    if not traits:
+        return df
+    mask = np.ones(len(df), dtype=bool)
     for t in traits:
-        df = df[df[t].str.lower() != 'no']
+        mask &= trait_present(df[t])
+    return df.loc[mask]
+
+def load_data(key):
+    return cache.get(key) if key else None
+
+def has_data(key):
+    # Existence check without unpickling the whole cached frame
+    return bool(key) and cache.has(key)
+
+def select_rows(key, selected_env, traits):
+    df = load_data(key)
+    if df is None:
+        return pd.DataFrame()
+    df = filter_by_traits(df, traits)
+    if selected_env:
+        df = df.loc[env_matches(df['Environment'], selected_env.strip().lower())]
     return df
 
-def create_sankey(df, style):
+def create_sankey(df, style, top_k=None):
     if df.empty:
         return go.Figure()
-    labels = list(pd.unique(df['Host_Genome'].tolist() + df['Plasmid_ID'].tolist() + df['Environment'].tolist()))
-    label_map = {label: i for i, label in enumerate(labels)}
-    source = df['Host_Genome'].map(label_map)
-    target = df['Plasmid_ID'].map(label_map)
-    env_source = df['Plasmid_ID'].map(label_map)
-    env_target = df['Environment'].map(label_map)
-    link_source = pd.concat([source, env_source])
-    link_target = pd.concat([target, env_target])
+    # One weighted flow per distinct host -> plasmid -> environment path, optionally only the heaviest
+    flows = df.groupby(['Host_Genome', 'Plasmid_ID', 'Environment'], observed=True, dropna=False).size()
+    if top_k:
+        flows = flows.nlargest(top_k)
+    flows = flows.reset_index(name='w')
+    n = len(flows)
+    all_labels = np.concatenate([flows['Host_Genome'].to_numpy(dtype=str),
+                                 flows['Plasmid_ID'].to_numpy(dtype=str),
+                                 flows['Environment'].to_numpy(dtype=str)])
+    labels, inverse = np.unique(all_labels, return_inverse=True)
+    host, plasmid, env = inverse[:n], inverse[n:2*n], inverse[2*n:]
+    # Host -> plasmid links in the first half, plasmid -> environment links in the second
+    link_source = np.empty(2 * n, dtype=np.int32)
+    link_source[:n], link_source[n:] = host, plasmid
+    link_target = np.empty(2 * n, dtype=np.int32)
+    link_target[:n], link_target[n:] = plasmid, env
+    # Flow weights are small counts: int16 halves them on the wire unless one flow is unusually heavy
+    weights = flows['w'].to_numpy()
+    link_value = np.empty(2 * n, dtype=np.int16 if weights.max() <= np.iinfo(np.int16).max else np.int32)
+    link_value[:n] = link_value[n:] = weights
     fig = go.Figure(data=[go.Sankey(
         node=dict(
             pad=15,
@@ -185,7 +285,7 @@ def create_sankey(df, style):
         link=dict(
             source=link_source,
             target=link_target,
-            value=[1]*len(link_source),
+            value=link_value,
             color=style['edge_color']
         )
     )])
@@ -193,15 +293,73 @@ def create_sankey(df, style):
                       font_size=style['font_size'], paper_bgcolor=style['bg_color'], margin=dict(l=50, r=50, t=80, b=40))
     return fig
 
-def create_network(df, style):
+@njit(parallel=True, fastmath=True, cache=True)
+def _fr_repulsion(x):
+    # Pairwise FR repulsion -log d (as -1/4 log d^2 over ordered pairs) and its gradient, without n x n temporaries
+    n = x.shape[0]
+    energy = np.zeros(n)
+    grad = np.zeros_like(x)
+    for i in prange(n):
+        e, gx, gy = 0.0, 0.0, 0.0
+        for j in range(n):
+            if i != j:
+                dx = x[i, 0] - x[j, 0]
+                dy = x[i, 1] - x[j, 1]
+                d2 = max(dx * dx + dy * dy, 1e-12)
+                e -= 0.25 * np.log(d2)
+                gx -= dx / d2
+                gy -= dy / d2
+        energy[i] = e
+        grad[i, 0] = gx
+        grad[i, 1] = gy
+    return energy.sum(), grad
+
+def _lbfgs_fr_layout(G, seed=42, gravity=0.1, maxiter=100):
+    """Fruchterman-Reingold layout found by minimising the FR energy with L-BFGS.
+
+    Works in units of the optimal edge length (k=1); the result is rescaled to [-1, 1]
+    like nx.spring_layout.
+    """
+    nodes = list(G.nodes())
+    n = len(nodes)
+    adj = nx.to_scipy_sparse_array(G, nodelist=nodes, weight=None, format='coo')
+    rows, cols = adj.row, adj.col
+    x0 = np.random.default_rng(seed).random(n * 2) * np.sqrt(n)
+
+    def energy(flat):
+        x = flat.reshape(n, 2)
+        # Attraction along edges: sum of d^3 / 3 (adjacency is symmetric, so halve)
+        delta = x[rows] - x[cols]
+        d = np.sqrt((delta ** 2).sum(axis=1))
+        e_att = (d ** 3).sum() / 6
+        grad = np.zeros_like(x)
+        np.add.at(grad, rows, d[:, None] * delta)
+        # Repulsion between every pair
+        e_rep, g_rep = _fr_repulsion(x)
+        grad += g_rep
+        # Weak pull to the origin keeps disconnected components from drifting apart
+        e_grav = 0.5 * gravity * (x ** 2).sum()
+        grad += gravity * x
+        return e_att + e_rep + e_grav, grad.ravel()
+
+    res = minimize(energy, x0, jac=True, method='L-BFGS-B', options={'maxiter': maxiter})
+    pos = nx.rescale_layout(res.x.reshape(n, 2))
+    return dict(zip(nodes, pos))
+
+def create_network(df, style, top_k=None):
     if df.empty:
         return go.Figure()
-    G = nx.Graph()
-    for _, row in df.iterrows():
-        G.add_node(row['Plasmid_ID'], type='plasmid')
-        G.add_node(row['Environment'], type='environment')
-        G.add_edge(row['Plasmid_ID'], row['Environment'])
-    pos = nx.spring_layout(G, seed=42, k=0.3/len(G.nodes()) if len(G.nodes()) > 0 else 0.3)
+    G = nx.from_pandas_edgelist(df, source='Plasmid_ID', target='Environment')
+    nx.set_node_attributes(G, {p: 'plasmid' for p in df['Plasmid_ID'].unique()}, 'type')
+    nx.set_node_attributes(G, {e: 'environment' for e in df['Environment'].unique()}, 'type')
+    if top_k and len(G) > top_k:
+        # Keep the best-connected nodes; the long tail adds DOM weight but little structure
+        G = G.subgraph([node for node, _ in sorted(G.degree, key=lambda d: -d[1])[:top_k]])
+    k = 0.3/len(G.nodes()) if len(G.nodes()) > 0 else 0.3
+    if len(G.nodes()) < 50:
+        pos = nx.spring_layout(G, seed=42, k=k)
+    else:
+        pos = _lbfgs_fr_layout(G)
     edge_x, edge_y = [], []
     for edge in G.edges():
         x0, y0 = pos[edge[0]]
@@ -214,12 +372,13 @@ def create_network(df, style):
         node_x.append(x)
         node_y.append(y)
         node_text.append(node)
+    scatter = go.Scattergl if len(node_x) >= WEBGL_MIN_POINTS else go.Scatter
     fig = go.Figure()
-    fig.add_trace(go.Scatter(x=edge_x, y=edge_y, mode='lines',
-                             line=dict(width=1, color=style['edge_color']), hoverinfo='none'))
-    fig.add_trace(go.Scatter(x=node_x, y=node_y, mode='markers+text', text=node_text,
-                             textposition="top center",
-                             marker=dict(size=style['node_size'], color=style['node_color'])))
+    fig.add_trace(scatter(x=edge_x, y=edge_y, mode='lines',
+                          line=dict(width=1, color=style['edge_color']), hoverinfo='none'))
+    fig.add_trace(scatter(x=node_x, y=node_y, mode='markers+text', text=node_text,
+                          textposition="top center",
+                          marker=dict(size=style['node_size'], color=style['node_color'])))
     fig.update_layout(title="Network of Shared Plasmids Across Environments",
                       showlegend=False, paper_bgcolor=style['bg_color'],
                       font_size=style['font_size'], margin=dict(l=10, r=10, t=60, b=40),
@@ -231,72 +390,216 @@ def create_network(df, style):
 def create_heatmap(df, scale, style):
     if df.empty:
         return go.Figure()
-    df_melted = df.melt(id_vars=['Plasmid_ID'], value_vars=['ARGs', 'Virulence', 'T4SS', 'MGEs'],
-                        var_name='Trait', value_name='Presence')
-    df_melted['Binary'] = df_melted['Presence'].apply(lambda x: 1 if str(x).lower() != 'no' else 0)
-    heat_df = df_melted.pivot(index='Plasmid_ID', columns='Trait', values='Binary').fillna(0)
-    fig = px.imshow(heat_df, text_auto=True, color_continuous_scale=scale, aspect='auto')
+    cols = ['ARGs', 'Virulence', 'T4SS', 'MGEs']
+    presence = np.column_stack([trait_present(df[c]) for c in cols]).astype(np.int8)
+    # One row per plasmid: a shared plasmid shows a trait if any of its records carries it
+    per_plasmid = pd.DataFrame(presence, columns=cols).groupby(df['Plasmid_ID'].astype(str).to_numpy()).max()
+    mat = per_plasmid.to_numpy(dtype=np.int8)
+    plasmid_ids = per_plasmid.index.to_numpy()
+    if mat.size >= HEATMAP_IMAGE_MIN_CELLS:
+        # Ship one PNG instead of a per-cell SVG; colour the 0/1 cells from the chosen scale by hand
+        palette = np.array(sample_colorscale(get_colorscale(scale), [0, 1], colortype='tuple')) * 255
+        fig = px.imshow(palette[mat].astype(np.uint8), binary_string=True, aspect='auto')
+        # Image traces index hover data per pixel and know neither the trait names nor the 0/1 values,
+        # so each pixel carries its own [Plasmid_ID, trait, value] for the same hover as the Heatmap branch
+        customdata = np.empty(mat.shape + (3,), dtype=object)
+        customdata[..., 0] = plasmid_ids[:, None]
+        customdata[..., 1] = np.array(cols, dtype=object)
+        customdata[..., 2] = mat
+        fig.update_traces(customdata=customdata,
+                          hovertemplate="Trait: %{customdata[1]}<br>Plasmid_ID: %{customdata[0]}"
+                                        "<br>Present: %{customdata[2]}<extra></extra>")
+        # The image draws no colour scale, so a data-less marker trace supplies the 0/1 colorbar
+        fig.add_trace(go.Scatter(x=[None], y=[None], mode='markers', hoverinfo='skip', showlegend=False,
+                                 marker=dict(color=[0], colorscale=scale, cmin=0, cmax=1, showscale=True)))
+        fig.update_xaxes(title_text='Trait', tickvals=list(range(len(cols))), ticktext=cols)
+        # Array ticks are never thinned, so only label every step-th row (about 50 labels in total)
+        step = max(1, len(plasmid_ids) // 50)
+        fig.update_yaxes(title_text='Plasmid_ID', tickvals=list(range(0, len(plasmid_ids), step)),
+                         ticktext=list(plasmid_ids[::step]))
+    else:
+        heatmap = go.Heatmap(z=mat, x=cols, y=plasmid_ids, colorscale=scale, zmin=0, zmax=1,
+                             hovertemplate="Trait: %{x}<br>Plasmid_ID: %{y}<br>Present: %{z}<extra></extra>")
+        # Per-cell labels are one SVG text node each, so only draw them for small matrices
+        if mat.size < HEATMAP_TEXT_MAX_CELLS:
+            heatmap.update(text=mat.astype(str), texttemplate='%{text}')
+        fig = go.Figure(heatmap)
+        fig.update_xaxes(title_text='Trait')
+        fig.update_yaxes(title_text='Plasmid_ID', autorange='reversed')
     fig.update_layout(title="Presence of Plasmid-Associated Traits",
                       font=dict(size=style['font_size']), paper_bgcolor=style['bg_color'],
                       margin=dict(l=40, r=40, t=60, b=30))
     return fig
 
+def with_uirevision(fig, tab, key):
+    # Zoom/pan survives filter changes on the same upload; a new dataset starts from a fresh view
+    fig.update_layout(uirevision=f'plasmidflow-{tab}-{key}')
+    return fig.to_plotly_json()
+
+# Built figures are kept in-process as plain plotly JSON dicts, so repeat states skip both the build and
+# go.Figure validation. Inputs are frozen into hashable tuples; the data key is a content hash, so entries never go stale.
+def freeze_style(style):
+    return tuple(sorted(style.items()))
+
+def sankey_figure(key, selected_env, traits, style, top_k=None):
+    return _build_sankey(key, selected_env, tuple(traits or ()), freeze_style(style), top_k)
+
+def network_figure(key, selected_env, traits, style, top_k=None):
+    return _build_network(key, selected_env, tuple(traits or ()), freeze_style(style), top_k)
+
+def heatmap_figure(key, selected_env, traits, scale, style):
+    return _build_heatmap(key, selected_env, tuple(traits or ()), scale, freeze_style(style))
+
+@functools.lru_cache(maxsize=64)
+def _build_sankey(key, selected_env, traits, style, top_k):
+    fig = create_sankey(select_rows(key, selected_env, list(traits)), dict(style), top_k)
+    return with_uirevision(fig, 'sankey', key)
+
+@functools.lru_cache(maxsize=64)
+def _build_network(key, selected_env, traits, style, top_k):
+    fig = create_network(select_rows(key, selected_env, list(traits)), dict(style), top_k)
+    return with_uirevision(fig, 'network', key)
+
+@functools.lru_cache(maxsize=64)
+def _build_heatmap(key, selected_env, traits, scale, style):
+    fig = create_heatmap(select_rows(key, selected_env, list(traits)), scale, dict(style))
+    return with_uirevision(fig, 'heatmap', key)
+
+def no_preview(message):
+    return html.Div(message), None, {"display": "none"}, [], [], 0, 0
+
 @app.callback(
     Output('output-preview', 'children'),
     Output('stored-data', 'data'),
+    Output('preview-pane', 'style'),
+    Output('preview-table', 'columns'),
+    Output('preview-table', 'data'),
+    Output('preview-table', 'page_count'),
+    Output('preview-table', 'page_current'),
     Input('upload-data', 'contents')
 )
 def update_output(contents):
     if contents:
         try:
             df = parse_contents(contents)
+            key = hashlib.blake2b(contents.encode('utf-8')).hexdigest()
             if df.empty or 'Plasmid_ID' not in df.columns:
-                return html.Div("⚠️ Uploaded file is invalid or missing required columns."), None
-            preview = dash_table.DataTable(
-                columns=[{"name": i, "id": i} for i in df.columns],
-                data=df.to_dict('records'),
-                page_size=5,
-                style_table={"overflowX": "auto"}
-            )
-            return preview, df.to_dict('records')
+                return no_preview("⚠️ Uploaded file is invalid or missing required columns.")
+            cache.set(key, df, timeout=0)
+            return (None, key, {},
+                    [{"name": i, "id": i} for i in df.columns],
+                    df.head(PREVIEW_PAGE_SIZE).to_dict('records'),
+                    -(-len(df) // PREVIEW_PAGE_SIZE), 0)
         except Exception as e:
-            return html.Div(f"❌ Error reading file: {str(e)}"), None
-    return html.Div("📁 Please upload a CSV file to begin."), None
+            return no_preview(f"❌ Error reading file: {str(e)}")
+    return no_preview("📁 Please upload a CSV file to begin.")
 
 @app.callback(
-    Output('tabs-content', 'children'),
-    Input('tabs', 'value'),
-    Input('custom-style', 'data'),
+    Output('preview-table', 'data'),
+    Input('preview-table', 'page_current'),
     State('stored-data', 'data'),
-    Input('env-filter', 'value'),
-    Input('sankey-traits', 'value'),
-    Input('network-traits', 'value'),
-    Input('heatmap-traits', 'value'),
-    Input('heatmap-colorscale', 'value')
+    prevent_initial_call=True
 )
-def render_content(tab, style, data, selected_env, sankey_traits, network_traits, heatmap_traits, scale):
+def page_preview(page, key):
+    df = load_data(key)
+    if df is None:
+        raise PreventUpdate
+    start = (page or 0) * PREVIEW_PAGE_SIZE
+    return df.iloc[start:start + PREVIEW_PAGE_SIZE].to_dict('records')
+
+def tab_style(style, tab):
     updated_style = style.copy()
     # Apply special defaults for sankey/network if not customized yet
     if style['node_color'] == 'dodgerblue' and style['edge_color'] == 'gray':
         if tab in ['sankey', 'network']:
             updated_style['node_color'] = 'red'
             updated_style['edge_color'] = 'skyblue'
+    return updated_style
+
+def render_tab(build, rendered, key, *args):
+    # `rendered` holds the arguments of the figure already in the graph; returning to the tab with
+    # nothing changed keeps that figure instead of re-sending it
+    current = [key, *args]
+    if ctx.triggered_id == 'tabs' and rendered == current:
+        return no_update, no_update, no_update
     try:
-        if not data:
-            return html.Div("Please upload a dataset.")
-        df = pd.DataFrame(data)
-        if selected_env:
-            df = df[df['Environment'].str.contains(selected_env.strip(), case=False, na=False)]
-        if tab == 'sankey':
-            return dcc.Graph(id='graph', figure=create_sankey(filter_by_traits(df.copy(), sankey_traits), updated_style))
-        elif tab == 'network':
-            return dcc.Graph(id='graph', figure=create_network(filter_by_traits(df.copy(), network_traits), updated_style))
-        elif tab == 'heatmap':
-            return dcc.Graph(id='graph', figure=create_heatmap(filter_by_traits(df.copy(), heatmap_traits), scale, updated_style))
+        if not has_data(key):
+            return go.Figure(), "Please upload a dataset.", current
+        return build(key, *args), None, current
     except Exception as e:
-        return html.Div(f"❌ Error rendering content: {str(e)}")
+        return go.Figure(), f"❌ Error rendering content: {str(e)}", current
 
 @app.callback(
+    Output('sankey-pane', 'style'),
+    Output('network-pane', 'style'),
+    Output('heatmap-pane', 'style'),
+    Input('tabs', 'value')
+)
+def show_tab(tab):
+    return [{} if tab == t else {"display": "none"} for t in ['sankey', 'network', 'heatmap']]
+
+@app.callback(
+    Output('sankey-graph', 'figure'),
+    Output('sankey-message', 'children'),
+    Output('sankey-rendered', 'data'),
+    Input('tabs', 'value'),
+    State('custom-style', 'data'),
+    Input('stored-data', 'data'),
+    Input('env-filter', 'value'),
+    Input('sankey-traits', 'value'),
+    Input('top-k', 'value'),
+    State('sankey-rendered', 'data'),
+    prevent_initial_call=True
+)
+def render_sankey_tab(tab, style, key, selected_env, traits, top_k, rendered):
+    if tab != 'sankey':
+        raise PreventUpdate
+    return render_tab(sankey_figure, rendered, key, selected_env, traits, tab_style(style, tab), top_k)
+
+@app.callback(
+    Output('network-graph', 'figure'),
+    Output('network-message', 'children'),
+    Output('network-rendered', 'data'),
+    Input('tabs', 'value'),
+    State('custom-style', 'data'),
+    Input('stored-data', 'data'),
+    Input('env-filter', 'value'),
+    Input('network-traits', 'value'),
+    Input('top-k', 'value'),
+    State('network-rendered', 'data'),
+    prevent_initial_call=True
+)
+def render_network_tab(tab, style, key, selected_env, traits, top_k, rendered):
+    if tab != 'network':
+        raise PreventUpdate
+    return render_tab(network_figure, rendered, key, selected_env, traits, tab_style(style, tab), top_k)
+
+@app.callback(
+    Output('heatmap-graph', 'figure'),
+    Output('heatmap-message', 'children'),
+    Output('heatmap-rendered', 'data'),
+    Input('tabs', 'value'),
+    State('custom-style', 'data'),
+    Input('stored-data', 'data'),
+    Input('env-filter', 'value'),
+    Input('heatmap-traits', 'value'),
+    Input('heatmap-colorscale', 'value'),
+    State('heatmap-rendered', 'data'),
+    prevent_initial_call=True
+)
+def render_heatmap_tab(tab, style, key, selected_env, traits, scale, rendered):
+    if tab != 'heatmap':
+        raise PreventUpdate
+    return render_tab(heatmap_figure, rendered, key, selected_env, traits, scale, tab_style(style, tab))
+
+# Style edits are handled in the browser: no server round trip per slider tick
+app.clientside_callback(
+    """
+    function(node_color, edge_color, node_size, bg_color, font_size) {
+        return {node_color: node_color, edge_color: edge_color, node_size: node_size,
+                bg_color: bg_color, font_size: font_size};
+    }
+    """,
     Output('custom-style', 'data'),
     Input('style-node-color', 'value'),
     Input('style-edge-color', 'value'),
@@ -304,14 +607,62 @@ def render_content(tab, style, data, selected_env, sankey_traits, network_traits
     Input('style-bg-color', 'value'),
     Input('style-font-size', 'value')
 )
-def update_style(node_color, edge_color, node_size, bg_color, font_size):
-    return {
-        "node_color": node_color,
-        "edge_color": edge_color,
-        "node_size": node_size,
-        "bg_color": bg_color,
-        "font_size": font_size
+
+# Restyle the visible figure in place; hidden tabs pick up the new style when they are next rendered
+app.clientside_callback(
+    """
+    function(style, tab, sankey_fig, network_fig, heatmap_fig) {
+        const no_update = window.dash_clientside.no_update;
+        const tabs = ['sankey', 'network', 'heatmap'];
+        const fig = {sankey: sankey_fig, network: network_fig, heatmap: heatmap_fig}[tab];
+        if (!style || !fig || !fig.data || !fig.data.length) {
+            return [no_update, no_update, no_update];
+        }
+        // Same defaults as tab_style() on the server
+        let node_color = style.node_color, edge_color = style.edge_color;
+        if (node_color === 'dodgerblue' && edge_color === 'gray' && tab !== 'heatmap') {
+            node_color = 'red';
+            edge_color = 'skyblue';
+        }
+        const patch = new window.dash_clientside.Patch();
+        patch.assign(['layout', 'font', 'size'], style.font_size);
+        patch.assign(['layout', 'paper_bgcolor'], style.bg_color);
+        if (tab === 'sankey') {
+            patch.assign(['data', 0, 'node', 'thickness'], style.node_size);
+            patch.assign(['data', 0, 'node', 'color'], node_color);
+            patch.assign(['data', 0, 'link', 'color'], edge_color);
+        } else if (tab === 'network') {
+            patch.assign(['data', 0, 'line', 'color'], edge_color);
+            patch.assign(['data', 1, 'marker', 'size'], style.node_size);
+            patch.assign(['data', 1, 'marker', 'color'], node_color);
+        }
+        return tabs.map(t => t === tab ? patch.build() : no_update);
     }
+    """,
+    Output('sankey-graph', 'figure', allow_duplicate=True),
+    Output('network-graph', 'figure', allow_duplicate=True),
+    Output('heatmap-graph', 'figure', allow_duplicate=True),
+    Input('custom-style', 'data'),
+    State('tabs', 'value'),
+    State('sankey-graph', 'figure'),
+    State('network-graph', 'figure'),
+    State('heatmap-graph', 'figure'),
+    prevent_initial_call=True
+)
+
+def store_render(path, image):
+    # Write next to the final name and rename, so a concurrent request never sees a partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(image)
+    os.replace(tmp_path, path)
+    # Keep only the most recently written renders so the cache cannot fill the disk
+    renders = sorted((e for e in os.scandir(RENDER_DIR) if e.is_file()), key=lambda e: e.stat().st_mtime, reverse=True)
+    for entry in renders[RENDER_CACHE_MAX:]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
 
 @app.callback(
     Output("download-image", "data"),
@@ -321,21 +672,26 @@ def update_style(node_color, edge_color, node_size, bg_color, font_size):
     State("stored-data", "data"),
     State("heatmap-colorscale", "value"),
     State("custom-style", "data"),
+    background=True,
+    running=[(Output("download-btn", "disabled"), True, False)],
     prevent_initial_call=True
 )
-def download_plot(n, tab, fmt, data, scale, style):
-    df = pd.DataFrame(data)
+def download_plot(n, tab, fmt, key, scale, style):
+    digest = hashlib.blake2b(json.dumps((key, tab, fmt, scale, style), sort_keys=True).encode()).hexdigest()
+    path = os.path.join(RENDER_DIR, f"{digest}.{fmt}")
+    if os.path.exists(path):
+        return dcc.send_file(path, filename=f"plasmidflow.{fmt}")
     if tab == 'sankey':
-        fig = create_sankey(df, style)
+        fig = sankey_figure(key, None, [], style)
     elif tab == 'network':
-        fig = create_network(df, style)
+        fig = network_figure(key, None, [], style)
     elif tab == 'heatmap':
-        fig = create_heatmap(df, scale, style)
+        fig = heatmap_figure(key, None, [], scale, style)
     try:
         import kaleido  # Ensure kaleido is available
-        with tempfile.NamedTemporaryFile(suffix=f".{fmt}", delete=False) as tmp:
-            pio.write_image(fig, tmp.name, format=fmt, width=1200, height=800, scale=2)
-            return dcc.send_file(tmp.name)
+        image = pio.to_image(fig, format=fmt, width=1200, height=800, scale=2)
+        store_render(path, image)
+        return dcc.send_bytes(image, filename=f"plasmidflow.{fmt}")
     except Exception as e:
         return dcc.send_string(f"Error: {str(e)}", filename="error.txt")
 
@@ -346,10 +702,7 @@ def download_plot(n, tab, fmt, data, scale, style):
     prevent_initial_call=True
 )
 def save_style(n, style):
-    with tempfile.NamedTemporaryFile(suffix=".json", delete=False, mode='w') as tmp:
-        json.dump(style, tmp)
-        tmp.flush()
-        return dcc.send_file(tmp.name)
+    return dcc.send_string(json.dumps(style), filename="style.json")
 
 @app.callback(
     Output("custom-style", "data", allow_duplicate=True),